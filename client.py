@@ -1,20 +1,21 @@
 import asyncio
-import base64
 from enum import Enum
+import functools
 import getpass
+import hashlib
+import random
 import time
-from typing import TypeVar, TypedDict
+from typing import TYPE_CHECKING, Awaitable, Callable, TypeVar, TypedDict
 
-import requests
-
-from Crypto.Cipher import AES
-from Crypto.Util.Padding import unpad
-
-from solders.keypair import Keypair
-from solders.transaction import VersionedTransaction
+import httpx
+import orjson
+import pybase64
 
 from loguru import logger
 
+if TYPE_CHECKING:
+    from solders.keypair import Keypair
+
 
 Data = TypeVar('Data')
 
@@ -106,66 +107,242 @@ TxStatusResponse = TypedDict('TxStatusResponse', {
 tx_base_url = "https://gmgn.ai/defi/router/v1"
 
 
-class SwapMode(Enum):
+# endpoint paths, relative to tx_base_url which the shared http client uses as base_url
+_PATH_GET_SWAP_ROUTE = 'sol/tx/get_swap_route'
+_PATH_SUBMIT_TX = 'sol/tx/submit_signed_transaction'
+_PATH_SUBMIT_ANTI_MEV_TX = 'sol/tx/submit_tx_anti_mev_mode'
+_PATH_GET_TX_STATUS = 'sol/tx/get_transaction_status'
+
+
+class SwapMode(str, Enum):
     EXACT_IN = "ExactIn"
     EXACT_OUT = "ExactOut"
 
 
+# decrypted private keys by (file path, sha256 of hex key), kept in memory as plain text for the life of the process
+_decrypted_pvk_cache: dict[tuple[str, bytes], str] = {}
+
+
+def _read_pvk_file(sol_pvk_file_path: str) -> str:
+    with open(sol_pvk_file_path, 'r') as f:
+        return f.read().strip('\t\n\r ')
+
+
+def _decrypt_pvk(encrypted_pvk: str, aes_256_hex_key: str) -> str:
+    if len(aes_256_hex_key) != 64:
+        raise Exception("GMGN_SOL_CLIENT: Hex Password must be 64 characters long")
+    # imported lazily, so clients with unencrypted keys never load the cipher backend
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    from cryptography.hazmat.primitives.padding import PKCS7
+    encrypted_bytes = pybase64.b64decode(encrypted_pvk.encode('utf-8'))
+    block_size = algorithms.AES256.block_size // 8
+    iv = encrypted_bytes[:block_size]
+    ciphertext = encrypted_bytes[block_size:]
+    decryptor = Cipher(algorithms.AES256(bytes.fromhex(aes_256_hex_key)), modes.CBC(iv)).decryptor()
+    padded_bytes = decryptor.update(ciphertext) + decryptor.finalize()
+    unpadder = PKCS7(algorithms.AES256.block_size).unpadder()
+    decrypted_bytes = unpadder.update(padded_bytes) + unpadder.finalize()
+    return decrypted_bytes.decode('utf-8')
+
+
+@functools.lru_cache(maxsize=32)
+def _load_keypair(pvk_base58: str) -> 'Keypair':
+    # solders is a native extension, imported on first use to keep module import cheap
+    from solders.keypair import Keypair
+    return Keypair.from_base58_string(pvk_base58)
+
+
+class _StatusPoller:
+    """Coalesces the tx status polling of all concurrent waiters.
+
+    Every tick sends one get_tx_status request per unique (hash, last_valid_height)
+    instead of one per waiter, and resolves the futures of all waiters of a tx once
+    its status is terminal. Ticks are staggered by fetch_interval_seconds / in_flight_polls
+    with random jitter, and at most in_flight_polls ticks are in flight at once.
+    """
+
+    def __init__(self,
+                 fetch: Callable[[str, int], Awaitable[TxStatusResponse]],
+                 fetch_interval_seconds: float,
+                 in_flight_polls: int,
+                 first_fetch_delay_seconds: float,
+                 fetch_jitter_seconds: float):
+        self._fetch = fetch
+        self._in_flight_polls = max(1, in_flight_polls)
+        self._stagger_seconds = fetch_interval_seconds / self._in_flight_polls
+        self._first_fetch_delay_seconds = first_fetch_delay_seconds
+        self._fetch_jitter_seconds = fetch_jitter_seconds
+        self._waiters: dict[tuple[str, int], list[asyncio.Future]] = {}
+        self._task: asyncio.Task | None = None
+        self._in_flight: set[asyncio.Task] = set()
+
+    def register(self, hash: str, last_valid_height: int) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault((hash, last_valid_height), []).append(future)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return future
+
+    async def _run(self):
+        await asyncio.sleep(self._first_fetch_delay_seconds)
+        while self._waiters:
+            if len(self._in_flight) >= self._in_flight_polls:
+                await asyncio.wait(self._in_flight, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            task = asyncio.create_task(self._poll(list(self._waiters)))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+            jitter = random.uniform(-self._fetch_jitter_seconds, self._fetch_jitter_seconds)
+            await asyncio.sleep(max(0, self._stagger_seconds + jitter))
+
+    async def _poll(self, keys: list[tuple[str, int]]):
+        results = await asyncio.gather(*(self._fetch(*key) for key in keys), return_exceptions=True)
+        for key, status in zip(keys, results):
+            # waiters that timed out have their futures cancelled, drop them here
+            futures = [future for future in self._waiters.get(key, []) if not future.done()]
+            # a failed or malformed status only affects its own tx, the waiters stay registered for the next tick
+            try:
+                if isinstance(status, BaseException):
+                    raise status
+                if status['success'] or status['failed'] or status['expired']:
+                    for future in futures:
+                        future.set_result(status)
+                    futures = []
+            except Exception as e:
+                logger.error(f'GMGN_SOL_CLIENT: Waiting for tx status error: {e}')
+            if futures:
+                self._waiters[key] = futures
+            else:
+                self._waiters.pop(key, None)
+
+
+_status_pollers: dict[tuple, _StatusPoller] = {}
+
+
+def _get_status_poller(client_cls: type, *config: float) -> _StatusPoller:
+    key = (client_cls, *config)
+    poller = _status_pollers.get(key)
+    if poller is None:
+        poller = _status_pollers[key] = _StatusPoller(client_cls.get_tx_status, *config)
+    return poller
+
+
 class GMGNSolClient:
 
+    __slots__ = ('_pvk', 'signer', 'signer_address')
+
+    _http_client: httpx.AsyncClient | None = None
+    _http_client_loop: asyncio.AbstractEventLoop | None = None
+
     def __init__(self, *, pvk_base58: str=None, sol_pvk_file_path: str=None, aes_256_hex_key: str=None):
         if sol_pvk_file_path:
-            with open(sol_pvk_file_path, 'r') as f:
-                pvk_base58 = f.read()
-                pvk_base58 = pvk_base58.strip('\t\n\r ')
-        if not aes_256_hex_key:
+            pvk_base58 = _read_pvk_file(sol_pvk_file_path)
+        # only prompt when no key is given at all, an empty string means the private key is not encrypted
+        if aes_256_hex_key is None:
             aes_256_hex_key = getpass.getpass('Please input decrypt aes_256_key for gmgn client solana encrypted private key (if not encrypted, please input empty): ')
         if aes_256_hex_key:
-            if len(aes_256_hex_key) != 64:
-                raise Exception("GMGN_SOL_CLIENT: Hex Password must be 64 characters long")
-            encrypted_bytes = base64.b64decode(pvk_base58.encode('utf-8'))
-            iv = encrypted_bytes[:AES.block_size]
-            ciphertext = encrypted_bytes[AES.block_size:]
-            cipher = AES.new(bytes.fromhex(aes_256_hex_key), AES.MODE_CBC, iv)
-            decrypted_bytes = unpad(cipher.decrypt(ciphertext), AES.block_size)
-            pvk_base58 = decrypted_bytes.decode('utf-8')
+            pvk_base58 = _decrypt_pvk(pvk_base58, aes_256_hex_key)
         self._pvk = pvk_base58
-        self.signer = Keypair.from_base58_string(pvk_base58)
+        self.signer = _load_keypair(pvk_base58)
         self.signer_address = str(self.signer.pubkey())
+
+    @classmethod
+    def from_encrypted_file(cls, sol_pvk_file_path: str, aes_256_hex_key: str) -> 'GMGNSolClient':
+        """Create a client from an AES-256-CBC encrypted private key file.
+
+        The decrypted key is memoized per (file path, hex key) for the life of the process,
+        so later clients for the same file skip the file read and decryption.
+
+        Args:
+            sol_pvk_file_path (str): Path of the file holding the base64 encoded encrypted private key
+            aes_256_hex_key (str): 64 characters hex AES-256 key
+
+        Returns:
+            GMGNSolClient: Client signing with the decrypted private key
+        """
+        cache_key = (sol_pvk_file_path, hashlib.sha256(aes_256_hex_key.encode('utf-8')).digest())
+        pvk_base58 = _decrypted_pvk_cache.get(cache_key)
+        if pvk_base58 is None:
+            pvk_base58 = _decrypt_pvk(_read_pvk_file(sol_pvk_file_path), aes_256_hex_key)
+            _decrypted_pvk_cache[cache_key] = pvk_base58
+        return cls(pvk_base58=pvk_base58, aes_256_hex_key='')
         
+    def _sign_tx(self, base64_tx: str) -> str:
+        from solders.message import to_bytes_versioned
+        from solders.transaction import VersionedTransaction
+        message = VersionedTransaction.from_bytes(pybase64.b64decode(base64_tx)).message
+        # populate() trusts its input, so do the signer checks VersionedTransaction(message, [signer]) would do
+        if message.header.num_required_signatures != 1:
+            raise Exception(f'GMGN_SOL_CLIENT: Tx requires {message.header.num_required_signatures} signatures, only the client signer is available')
+        if message.account_keys[0] != self.signer.pubkey():
+            raise Exception(f'GMGN_SOL_CLIENT: Tx fee payer {message.account_keys[0]} does not match signer {self.signer_address}')
+        signature = self.signer.sign_message(to_bytes_versioned(message))
+        signed_tx = VersionedTransaction.populate(message, [signature])
+        return pybase64.b64encode(bytes(signed_tx)).decode('utf-8')
+
     def sign_raw_tx(self, base64_tx: str) -> str:
-        tx_bytes = base64.b64decode(base64_tx)
-        tx = VersionedTransaction.from_bytes(tx_bytes)
-        signed_tx = VersionedTransaction(tx.message, [self.signer])
-        return base64.b64encode(bytes(signed_tx)).decode('utf-8')
+        return self._sign_tx(base64_tx)
+
+    def sign_raw_txs(self, base64_txs: list[str]) -> list[str]:
+        """Sign many base64 encoded raw txs in one call, e.g. for bulk pipelines.
+
+        Args:
+            base64_txs (list[str]): Base64 encoded unsigned transactions
+
+        Returns:
+            list[str]: Base64 encoded signed transactions, in the same order
+
+        Raises:
+            Exception: If a tx does not require exactly one signature from the client signer
+        """
+        return [self._sign_tx(base64_tx) for base64_tx in base64_txs]
 
     @classmethod
-    async def get(cls, other_path: str, **kwargs) -> ResponseData:    
-        url = f'{tx_base_url}/{other_path.strip("/")}'
-        resp = await asyncio.to_thread(requests.get, url, kwargs)
-        status_code = resp.status_code
-        if status_code != 200:
-            raise Exception(f'GMGN_SOL_CLIENT: GET Error {status_code}, {url}')
-        data = ResponseData(resp.json())
+    def _client(cls) -> httpx.AsyncClient:
+        # the pooled connections belong to the loop that opened them, so rebuild the client for a new loop
+        loop = asyncio.get_running_loop()
+        if cls._http_client is None or cls._http_client_loop is not loop:
+            cls._http_client_loop = loop
+            cls._http_client = httpx.AsyncClient(
+                base_url=tx_base_url,
+                http2=True,
+                timeout=30,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+            )
+        return cls._http_client
+
+    @classmethod
+    async def aclose(cls):
+        """Close the shared HTTP client and release its pooled connections, e.g. before the event loop shuts down.
+
+        Not required to switch event loops, a client built on another loop is replaced on the next request anyway.
+        """
+        if cls._http_client is not None and cls._http_client_loop is asyncio.get_running_loop():
+            await cls._http_client.aclose()
+        cls._http_client = None
+        cls._http_client_loop = None
+
+    @staticmethod
+    def _parse_response(method: str, resp: httpx.Response) -> Data:
+        if resp.status_code != 200:
+            raise Exception(f'GMGN_SOL_CLIENT: {method} Error {resp.status_code}, {resp.request.url}')
+        data: ResponseData = orjson.loads(resp.content)
         if not isinstance(data, dict):
-            raise Exception(f'GMGN_SOL_CLIENT: Response data is not a dict: {data}, {url}')
+            raise Exception(f'GMGN_SOL_CLIENT: Response data is not a dict: {data}, {resp.request.url}')
         if data['code'] != 0:
-            raise Exception(f'GMGN_SOL_CLIENT: GET Error {data["code"]} - {data["msg"]}, {url}')
+            raise Exception(f'GMGN_SOL_CLIENT: {method} Error {data["code"]} - {data["msg"]}, {resp.request.url}')
         return data['data']
+
+    @classmethod
+    async def get(cls, other_path: str, **kwargs) -> ResponseData:    
+        # httpx joins other_path onto base_url itself, a leading '/' is dropped
+        resp = await cls._client().get(other_path, params=kwargs)
+        return cls._parse_response('GET', resp)
     
     @classmethod
     async def post(cls, other_path: str, body: dict) -> ResponseData:
-        url = f'{tx_base_url}/{other_path.strip("/")}'
-        resp = await asyncio.to_thread(requests.post, url, json=body)
-        status_code = resp.status_code
-        if status_code != 200:
-            raise Exception(f'GMGN_SOL_CLIENT: POST Error {status_code}, {url}')
-        data = ResponseData(resp.json())
-        if not isinstance(data, dict):
-            raise Exception(f'GMGN_SOL_CLIENT: Response data is not a dict: {data}, {url}')
-        if data['code'] != 0:
-            raise Exception(f'GMGN_SOL_CLIENT: POST Error {data["code"]} - {data["msg"]}, {url}')
-        return data['data']
+        resp = await cls._client().post(other_path, json=body)
+        return cls._parse_response('POST', resp)
     
     async def get_swap_route(self,
                               * ,
@@ -202,15 +379,20 @@ class GMGNSolClient:
 
         if fee > 5:
             raise Exception('GMGN_SOL_CLIENT: Fee must be less than 5')
-        params = locals()
-        del params['self']
-        if not is_anti_mev:
-            params.pop('is_anti_mev')
-        if not partner:
-            params.pop('partner')
-        if not from_address:
-            params['from_address'] = self.signer_address
-        return await self.get('sol/tx/get_swap_route', **params)
+        params = {
+            'token_in_address': token_in_address,
+            'token_out_address': token_out_address,
+            'in_amount': in_amount,
+            'slippage': slippage,
+            'swap_mode': SwapMode(swap_mode).value,
+            'fee': fee,
+            'from_address': from_address or self.signer_address
+        }
+        if is_anti_mev:
+            params['is_anti_mev'] = True
+        if partner:
+            params['partner'] = partner
+        return await self.get(_PATH_GET_SWAP_ROUTE, **params)
     
     async def test_speed(self):
         import statistics
@@ -223,26 +405,40 @@ class GMGNSolClient:
         print(f'Time taken: {times}, avg: {sum(times) / len(times)} seconds, std: {statistics.stdev(times)}')
     
     async def submit_tx(self, signed_tx: str) -> SubmitTxResponse:
-        return await self.post('sol/tx/submit_signed_transaction', body={'signed_tx': signed_tx})
+        return await self.post(_PATH_SUBMIT_TX, body={'signed_tx': signed_tx})
     
     async def submit_anti_mev_tx(self, signed_tx: str, from_address: str=None) -> SubmitAntiMevTxResponse:
-        if not from_address:
-            from_address = self.signer_address
-        return await self.post('sol/tx/submit_tx_anti_mev_mode', body={'signed_tx': signed_tx, 'from_address': from_address})
+        return await self.post(_PATH_SUBMIT_ANTI_MEV_TX, body={'signed_tx': signed_tx, 'from_address': from_address or self.signer_address})
 
     @classmethod
     async def get_tx_status(cls, hash: str, last_valid_height: int) -> TxStatusResponse:
-        return await cls.get('sol/tx/get_transaction_status', hash=hash, last_valid_height=last_valid_height)
+        return await cls.get(_PATH_GET_TX_STATUS, hash=hash, last_valid_height=last_valid_height)
     
     @classmethod
-    async def wait_tx_status(cls, hash: str, last_valid_height: int, fetch_interval_seconds: float=0.4, timeout_seconds: float=60) -> TxStatusResponse:
+    async def wait_tx_status(cls,
+                             hash: str,
+                             last_valid_height: int,
+                             fetch_interval_seconds: float=0.4,
+                             timeout_seconds: float=60,
+                             in_flight_polls: int=2,
+                             first_fetch_delay_seconds: float=0.05,
+                             fetch_jitter_seconds: float=0.05) -> TxStatusResponse:
         """Wait for transaction status from GMGN API.
 
+        Concurrent waiters with the same polling settings share one poller, which sends
+        a single status request per tx per round no matter how many coroutines wait on it.
+
         Args:
             hash (str): Transaction hash
             last_valid_height (int): Last valid block height for transaction
-            fetch_interval_seconds (float, optional): Interval between status checks in seconds. Defaults to 0.4, because solana block update interval is 0.4 seconds.
+            fetch_interval_seconds (float, optional): Interval between status check rounds in seconds. Defaults to 0.4, because solana block update interval is 0.4 seconds.
             timeout_seconds (float, optional): Maximum time to wait for status in seconds. Defaults to 60.
+            in_flight_polls (int, optional): Number of staggered status checks issued per round. Defaults to 2,
+                                             i.e. one check at the start of the round and one half an interval later.
+            first_fetch_delay_seconds (float, optional): Delay before the first round when polling starts, in seconds. Defaults to 0.05,
+                                                         because a tx typically lands within one slot.
+            fetch_jitter_seconds (float, optional): Maximum random offset added to each interval in seconds, so that
+                                                    many concurrent waiters do not poll on the same tick. Defaults to 0.05.
 
         Returns:
             TxStatusResponse: Transaction status details from API
@@ -250,16 +446,11 @@ class GMGNSolClient:
         Raises:
             Exception: If transaction status not found after timeout period
         """
-        start_time = time.time()
-        while time.time() - start_time < timeout_seconds:
-            try:
-                status = await cls.get_tx_status(hash, last_valid_height)
-                if status['success'] or status['failed'] or status['expired']:
-                    return status
-            except Exception as e:
-                logger.error(f'GMGN_SOL_CLIENT: Waiting for tx status error: {e}')
-            await asyncio.sleep(fetch_interval_seconds)
-        raise Exception(f'GMGN_SOL_CLIENT: Transaction {hash} status not found after {timeout_seconds} seconds')
+        poller = _get_status_poller(cls, fetch_interval_seconds, in_flight_polls, first_fetch_delay_seconds, fetch_jitter_seconds)
+        try:
+            return await asyncio.wait_for(poller.register(hash, last_valid_height), timeout_seconds)
+        except asyncio.TimeoutError:
+            raise Exception(f'GMGN_SOL_CLIENT: Transaction {hash} status not found after {timeout_seconds} seconds') from None
     
     async def swap(self,
                       * ,
@@ -301,11 +492,18 @@ class GMGNSolClient:
             Exception: If transaction status cannot be retrieved within timeout period
         """
 
-        params = locals()
-        del params['self']
-        del params['wait_tx_fetch_interval_seconds']
-        del params['wait_tx_timeout_seconds']
-        quote = await self.get_swap_route(**params)
+        from_address = from_address or self.signer_address
+        quote = await self.get_swap_route(
+            token_in_address=token_in_address,
+            token_out_address=token_out_address,
+            in_amount=in_amount,
+            slippage=slippage,
+            swap_mode=swap_mode,
+            fee=fee,
+            from_address=from_address,
+            is_anti_mev=is_anti_mev,
+            partner=partner
+        )
         unsigned_tx = quote['raw_tx']['swapTransaction']
         signed_tx = self.sign_raw_tx(unsigned_tx)
         last_valid_height = quote['raw_tx']['lastValidBlockHeight']
@@ -314,7 +512,7 @@ class GMGNSolClient:
             sub_resp = await self.submit_tx(signed_tx)
             tx_hash = sub_resp['hash']
         else:
-            sub_resp = await self.submit_anti_mev_tx(signed_tx)
+            sub_resp = await self.submit_anti_mev_tx(signed_tx, from_address)
             tx_hash = sub_resp['tx_hash']
         status_resp = await self.wait_tx_status(tx_hash, last_valid_height, wait_tx_fetch_interval_seconds, wait_tx_timeout_seconds)
         return quote, sub_resp, status_resp
@@ -322,13 +520,18 @@ class GMGNSolClient:
 
 if __name__ == '__main__':
     import os
+    try:
+        # uvloop cuts syscall and timer overhead for the many small polling requests
+        from uvloop import run
+    except ImportError:
+        from asyncio import run
     home_dir = os.path.expanduser('~')
     pvk_file_path = os.path.join(home_dir, 'test_tokens', 'sol_test_pvk')
     client = GMGNSolClient(sol_pvk_file_path=pvk_file_path)
     print('signer address')
     print(client.signer_address)
     
-    asyncio.run(client.test_speed())
+    run(client.test_speed())
     
     # token_in_address='So11111111111111111111111111111111111111112'
     # token_out_address='HeLp6NuQkmYB4pYWo2zYs22mESHXPQYzXbB8n4V98jwC'
@@ -336,7 +539,7 @@ if __name__ == '__main__':
     # slippage=10
     # swap_mode=SwapMode.EXACT_IN
     
-    # quote, sub_resp, status_resp = asyncio.run(client.swap(
+    # quote, sub_resp, status_resp = run(client.swap(
     #     token_in_address=token_in_address,
     #     token_out_address=token_out_address,
     #     in_amount=in_amount,
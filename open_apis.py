@@ -1,13 +1,23 @@
 import asyncio
+from dataclasses import dataclass
 from enum import Enum
 from typing import TypeVar, TypedDict
 
-import requests
+import httpx
+import numpy as np
+import orjson
 
 
 base_url = 'https://www.gmgn.cc'
 
 
+_KLINE_PATH = '/defi/quotation/v1/tokens/kline'
+
+
+_http_client: httpx.AsyncClient | None = None
+_http_client_loop: asyncio.AbstractEventLoop | None = None
+
+
 Data = TypeVar('Data')
 
 
@@ -27,28 +37,85 @@ Kline = TypedDict('Kline', {
     'volume': str
 })
 
-class Network(Enum):
+
+@dataclass
+class Klines:
+    """Klines in columnar form, one contiguous array per field, parsed once from the API's string values."""
+    open: np.ndarray
+    close: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    time: np.ndarray
+    volume: np.ndarray
+
+    @classmethod
+    def from_raw(cls, raw: list[Kline] | None) -> 'Klines':
+        # the API returns null data for ranges without klines
+        raw = raw or []
+        n = len(raw)
+        def column(key: str, dtype: type, convert: type) -> np.ndarray:
+            return np.fromiter((convert(k[key]) for k in raw), dtype=dtype, count=n)
+        return cls(
+            open=column('open', np.float64, float),
+            close=column('close', np.float64, float),
+            high=column('high', np.float64, float),
+            low=column('low', np.float64, float),
+            time=column('time', np.int64, int),
+            volume=column('volume', np.float64, float)
+        )
+
+class Network(str, Enum):
     SOLANA = 'sol'
     ETHEREUM = 'eth'
     
 
-class Period(Enum):
+class Period(str, Enum):
     ONE_HOUR = '1h'
 
 
-async def get_klines(network: Network, token: str, period: Period, from_seconds: int, to_seconds: int) -> list[Kline]:
-    url = f'{base_url}/defi/quotation/v1/tokens/kline/{network.value}/{token}?resolution={period.value}&from={from_seconds}&to={to_seconds}'
-    resp = await asyncio.to_thread(requests.get, url)
-    status_code = resp.status_code
-    if status_code != 200:
-        raise Exception(f'GMGN Open API Error: {status_code}')
-    data = ResponseData(resp.json())
+def _client() -> httpx.AsyncClient:
+    global _http_client, _http_client_loop
+    # the pooled connections belong to the loop that opened them, so rebuild the client for a new loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client_loop is not loop:
+        _http_client_loop = loop
+        _http_client = httpx.AsyncClient(
+            base_url=base_url,
+            http2=True,
+            timeout=30,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+    return _http_client
+
+
+async def aclose():
+    """Close the shared HTTP client and release its pooled connections, e.g. before the event loop shuts down.
+
+    Not required to switch event loops, a client built on another loop is replaced on the next request anyway.
+    """
+    global _http_client, _http_client_loop
+    if _http_client is not None and _http_client_loop is asyncio.get_running_loop():
+        await _http_client.aclose()
+    _http_client = None
+    _http_client_loop = None
+
+
+async def get_klines(network: Network, token: str, period: Period, from_seconds: int, to_seconds: int) -> Klines:
+    params = {'resolution': Period(period).value, 'from': from_seconds, 'to': to_seconds}
+    resp = await _client().get(f'{_KLINE_PATH}/{Network(network).value}/{token}', params=params)
+    if resp.status_code != 200:
+        raise Exception(f'GMGN Open API Error: {resp.status_code}, {resp.request.url}')
+    data = orjson.loads(resp.content)
     code = data['code'] 
     if code != 0:
         raise Exception(f'GMGN Open API Error: {code} - {data["msg"]}')
-    return data['data']
+    return Klines.from_raw(data['data'])
 
 
 if __name__ == '__main__':
-    klines = asyncio.run(get_klines(Network.SOLANA, 'HeLp6NuQkmYB4pYWo2zYs22mESHXPQYzXbB8n4V98jwC', Period.ONE_HOUR, 1715731200, 1715734800))
+    try:
+        from uvloop import run
+    except ImportError:
+        from asyncio import run
+    klines = run(get_klines(Network.SOLANA, 'HeLp6NuQkmYB4pYWo2zYs22mESHXPQYzXbB8n4V98jwC', Period.ONE_HOUR, 1715731200, 1715734800))
     print(klines)
\ No newline at end of file
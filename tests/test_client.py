@@ -0,0 +1,91 @@
+import asyncio
+import os
+import sys
+
+import httpx
+import orjson
+import pybase64
+import pytest
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.message import MessageV0
+from solders.signature import Signature
+from solders.system_program import TransferParams, transfer
+from solders.transaction import VersionedTransaction
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client import GMGNSolClient, tx_base_url
+
+
+def unsigned_transfer(*signers: Keypair) -> tuple[MessageV0, str]:
+    payer = signers[0].pubkey()
+    instructions = [transfer(TransferParams(from_pubkey=signer.pubkey(), to_pubkey=payer, lamports=1)) for signer in signers]
+    message = MessageV0.try_compile(payer, instructions, [], Hash.default())
+    unsigned_tx = VersionedTransaction.populate(message, [Signature.default()] * len(signers))
+    return message, pybase64.b64encode(bytes(unsigned_tx)).decode('utf-8')
+
+
+def test_sign_raw_tx_matches_versioned_transaction_signing():
+    signer = Keypair()
+    client = GMGNSolClient(pvk_base58=str(signer), aes_256_hex_key='')
+    message, base64_tx = unsigned_transfer(signer)
+    assert client.sign_raw_tx(base64_tx) == pybase64.b64encode(bytes(VersionedTransaction(message, [signer]))).decode('utf-8')
+
+
+def test_sign_raw_tx_rejects_other_fee_payer():
+    client = GMGNSolClient(pvk_base58=str(Keypair()), aes_256_hex_key='')
+    _, base64_tx = unsigned_transfer(Keypair())
+    with pytest.raises(Exception, match='does not match signer'):
+        client.sign_raw_tx(base64_tx)
+
+
+def test_sign_raw_tx_rejects_multiple_required_signatures():
+    signer = Keypair()
+    client = GMGNSolClient(pvk_base58=str(signer), aes_256_hex_key='')
+    _, base64_tx = unsigned_transfer(signer, Keypair())
+    with pytest.raises(Exception, match='requires 2 signatures'):
+        client.sign_raw_tx(base64_tx)
+
+
+def test_sign_raw_txs_checks_every_tx():
+    signer = Keypair()
+    client = GMGNSolClient(pvk_base58=str(signer), aes_256_hex_key='')
+    _, base64_tx = unsigned_transfer(signer)
+    assert client.sign_raw_txs([base64_tx]) == [client.sign_raw_tx(base64_tx)]
+    with pytest.raises(Exception, match='does not match signer'):
+        client.sign_raw_txs([base64_tx, unsigned_transfer(Keypair())[1]])
+
+
+def test_http_client_is_rebuilt_for_a_new_event_loop():
+    async def get_client():
+        return GMGNSolClient._client()
+
+    first = asyncio.run(get_client())
+    second = asyncio.run(get_client())
+    assert first is not second
+
+
+def test_malformed_tx_status_does_not_stall_other_waiters():
+    statuses = {
+        'unknown': None,
+        'landed': {'success': True, 'failed': False, 'expired': False, 'err': None, 'err_code': ''},
+    }
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = statuses[request.url.params['hash']]
+        return httpx.Response(200, content=orjson.dumps({'code': 0, 'data': status, 'msg': 'success'}))
+
+    async def wait_both():
+        GMGNSolClient._http_client = httpx.AsyncClient(base_url=tx_base_url, transport=httpx.MockTransport(handler))
+        GMGNSolClient._http_client_loop = asyncio.get_running_loop()
+        return await asyncio.gather(
+            GMGNSolClient.wait_tx_status('unknown', 1, timeout_seconds=1),
+            GMGNSolClient.wait_tx_status('landed', 1, timeout_seconds=1),
+            return_exceptions=True
+        )
+
+    unknown, landed = asyncio.run(wait_both())
+    assert isinstance(unknown, Exception)
+    assert 'status not found' in str(unknown)
+    assert landed == statuses['landed']
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import sys
+
+import httpx
+import numpy as np
+import orjson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import open_apis
+from open_apis import Klines, Network, Period, get_klines
+
+
+requested_urls = []
+
+
+def fetch_klines(data, *args) -> Klines:
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested_urls.append(str(request.url))
+        return httpx.Response(200, content=orjson.dumps({'code': 0, 'data': data, 'msg': 'success'}))
+
+    async def fetch():
+        open_apis._http_client = httpx.AsyncClient(base_url=open_apis.base_url, transport=httpx.MockTransport(handler))
+        open_apis._http_client_loop = asyncio.get_running_loop()
+        return await get_klines(*(args or (Network.SOLANA, 'token', Period.ONE_HOUR, 1715731200, 1715734800)))
+
+    return asyncio.run(fetch())
+
+
+def test_get_klines_returns_columnar_arrays():
+    klines = fetch_klines([
+        {'open': '1.5', 'close': '2', 'high': '2.5', 'low': '1', 'time': '1715731200000', 'volume': '10.25'},
+        {'open': '2', 'close': '1.75', 'high': '2', 'low': '1.5', 'time': '1715734800000', 'volume': '3'},
+    ])
+    assert klines.open.dtype == np.float64
+    assert klines.time.dtype == np.int64
+    np.testing.assert_array_equal(klines.close, [2, 1.75])
+    np.testing.assert_array_equal(klines.time, [1715731200000, 1715734800000])
+    np.testing.assert_array_equal(klines.volume, [10.25, 3])
+
+
+def test_get_klines_null_data_is_empty():
+    klines = fetch_klines(None)
+    assert len(klines.open) == 0
+    assert len(klines.time) == 0
+
+
+def test_get_klines_accepts_raw_network_and_period_strings():
+    klines = fetch_klines([], 'sol', 'token', '1h', 1715731200, 1715734800)
+    assert len(klines.close) == 0
+    assert requested_urls[-1] == f'{open_apis.base_url}/defi/quotation/v1/tokens/kline/sol/token?resolution=1h&from=1715731200&to=1715734800'